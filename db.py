@@ -6,19 +6,110 @@ Includes support fields:
 - repeat (text: 'daily'|'weekly'|'monthly' or NULL)
 - pending_auto_mark (0/1)
 """
+import re
 import sqlite3
-from typing import Optional, List, Dict
-from contextlib import closing
+import threading
+from typing import Optional, List
 from dateutil import parser as dateparser
-from datetime import timedelta
+from datetime import date, datetime, timedelta, timezone
 import pytz
 
+try:
+    import ciso8601
+except ImportError:
+    ciso8601 = None
+
+
+def _parse_iso_dt(s: str):
+    """Parse an ISO string, preferring ciso8601's C parser over dateutil."""
+    if ciso8601 is not None:
+        try:
+            return ciso8601.parse_datetime(s)
+        except ValueError:
+            pass
+    return dateparser.isoparse(s)
+
 DB_PATH = "events.db"
 LOCAL_TZ = pytz.timezone("Asia/Ho_Chi_Minh")
+# Asia/Ho_Chi_Minh has been fixed +07:00 since 1975, so the hot paths can use
+# a cached fixed-offset tzinfo instead of pytz.localize (no DST lookup).
+FIXED_LOCAL = timezone(LOCAL_TZ.utcoffset(datetime.now()))
+
+# one long-lived connection per thread (reminder thread + Streamlit thread);
+# opening a fresh connection per call costs URI parsing, page-cache allocation
+# and schema lookups every time.
+_local = threading.local()
+_write_lock = threading.Lock()
+
+# bumped on every write; the UI keys its caches on this instead of re-scanning
+_db_version = 0
+
+# called after every committed write; the reminder scheduler registers its
+# wakeup here so it can sleep until the next real deadline instead of polling
+_change_listeners: List = []
+
+
+def add_change_listener(fn):
+    _change_listeners.append(fn)
+
+
+def _bump_version():
+    global _db_version
+    _db_version += 1
+    for fn in _change_listeners:
+        fn()
+
+
+def get_version() -> int:
+    return _db_version
+
+
+class EventRow(sqlite3.Row):
+    """
+    sqlite3.Row with dict-style .get(), so query results can be returned
+    as-is (C-level column access) instead of being copied into dicts.
+    """
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except IndexError:
+            return default
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    Open a connection with performance pragmas applied.
+    WAL lets the reminder thread read while Streamlit writes;
+    synchronous=NORMAL drops the per-commit fsync cost.
+    """
+    # cached_statements is raised so the repeated INSERT/UPDATE/SELECT texts
+    # stay prepared on the long-lived connection instead of being re-parsed.
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256)
+    cur = conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA mmap_size=268435456")
+    cur.execute("PRAGMA cache_size=-20000")
+    # SQLite's built-in lower() only folds ASCII; Vietnamese event names need
+    # full Unicode case folding, so expose Python's str.lower to the VM
+    conn.create_function("ulower", 1, str.lower, deterministic=True)
+    conn.row_factory = EventRow
+    return conn
+
+
+def _get_conn() -> sqlite3.Connection:
+    """Return this thread's cached connection, creating it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _connect()
+        _local.conn = conn
+    return conn
 
 
 def init_db():
-    with closing(sqlite3.connect(DB_PATH)) as conn:
+    with _write_lock:
+        conn = _get_conn()
         cur = conn.cursor()
         cur.execute("""
         CREATE TABLE IF NOT EXISTS events (
@@ -37,37 +128,62 @@ def init_db():
             pending_auto_mark INTEGER DEFAULT 0
         );
         """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_events_start ON events(start_time)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_events_event_nocase ON events(event COLLATE NOCASE)")
+        # partial index: only actionable rows, so the reminder poll is O(due)
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_next_notify ON events(next_notify)
+        WHERE notified = 0 AND isStop = 0
+        """)
+        # add missing columns (older DBs) — check table_info once instead of
+        # probing with ALTERs and swallowing OperationalError each startup
+        cols = {r[1] for r in cur.execute("PRAGMA table_info(events)")}
+        for name, ddl in [("next_notify", "TEXT DEFAULT NULL"),
+                          ("repeat", "TEXT DEFAULT NULL"),
+                          ("pending_auto_mark", "INTEGER DEFAULT 0")]:
+            if name not in cols:
+                cur.execute(f"ALTER TABLE events ADD COLUMN {name} {ddl}")
         conn.commit()
-        # try to add missing columns safely (no-op if exists)
-        try:
-            cur.execute("ALTER TABLE events ADD COLUMN next_notify TEXT DEFAULT NULL")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass
-        try:
-            cur.execute("ALTER TABLE events ADD COLUMN repeat TEXT DEFAULT NULL")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass
-        try:
-            cur.execute("ALTER TABLE events ADD COLUMN pending_auto_mark INTEGER DEFAULT 0")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass
+
+
+# the shape our own writers produce: YYYY-MM-DDTHH:MM[:SS[.ffffff]][±HH:MM]
+_ISO_FAST_RE = re.compile(
+    r"^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2})(?::\d{2}(?:\.\d+)?)?([+-]\d{2}:\d{2})?$")
 
 
 def _compute_next_notify_iso(start_time_iso: str, reminder_minutes: int) -> Optional[str]:
     """
     Compute start_time - reminder_minutes, floor seconds to 0, return ISO with tz.
+    Fast path does the subtraction on ints when the input matches our own
+    ISO shape; anything else falls through to the full parser.
     """
+    m = _ISO_FAST_RE.match(start_time_iso or "")
+    # only take the int path for naive or already-local inputs; any other
+    # offset must go through astimezone so next_notify stays comparable to
+    # the +07:00 "now" strings the pending queries compare against
+    if m and m.group(6) in (None, "+07:00"):
+        try:
+            y, mo, d, h, mi = (int(g) for g in m.groups()[:5])
+            # validate the calendar date and clock fields up front so the
+            # fast path rejects exactly what the full parser rejects
+            base = date(y, mo, d)
+            if h > 23 or mi > 59:
+                raise ValueError(start_time_iso)
+            days, rem = divmod(h * 60 + mi - int(reminder_minutes or 0), 1440)
+            if days:
+                base += timedelta(days=days)
+            nh, nm = divmod(rem, 60)
+            return f"{base.year:04d}-{base.month:02d}-{base.day:02d}T{nh:02d}:{nm:02d}:00+07:00"
+        except ValueError:
+            pass
     try:
-        dt = dateparser.isoparse(start_time_iso)
+        dt = _parse_iso_dt(start_time_iso)
         if dt.tzinfo is None:
-            dt = LOCAL_TZ.localize(dt)
+            dt = dt.replace(tzinfo=FIXED_LOCAL)
         next_dt = dt - timedelta(minutes=int(reminder_minutes or 0))
         # floor seconds/microseconds
         next_dt = next_dt.replace(second=0, microsecond=0)
-        next_dt = next_dt.astimezone(LOCAL_TZ)
+        next_dt = next_dt.astimezone(FIXED_LOCAL)
         return next_dt.isoformat()
     except Exception:
         return None
@@ -77,40 +193,148 @@ def add_event(event: str, start_time: str, end_time: Optional[str], location: Op
               reminder_minutes: int, repeat: Optional[str] = None) -> int:
     """
     Insert event and compute next_notify. Returns inserted row id.
+    Computes next_notify up front so the insert is a single statement/commit.
     """
-    with closing(sqlite3.connect(DB_PATH)) as conn:
+    next_iso = _compute_next_notify_iso(start_time, reminder_minutes)
+    with _write_lock:
+        conn = _get_conn()
         cur = conn.cursor()
         cur.execute("""
-        INSERT INTO events (event, start_time, end_time, location, reminder_minutes, notified, repeat)
-        VALUES (?, ?, ?, ?, ?, 0, ?)
-        """, (event, start_time, end_time, location, reminder_minutes, repeat))
+        INSERT INTO events (event, start_time, end_time, location, reminder_minutes, notified, repeat, next_notify)
+        VALUES (?, ?, ?, ?, ?, 0, ?, ?)
+        """, (event, start_time, end_time, location, reminder_minutes, repeat, next_iso))
         conn.commit()
-        rowid = cur.lastrowid
+        _bump_version()
+        return cur.lastrowid
 
-        next_iso = _compute_next_notify_iso(start_time, reminder_minutes)
-        if next_iso:
-            cur.execute("UPDATE events SET next_notify = ? WHERE id = ?", (next_iso, rowid))
-            conn.commit()
 
-        return rowid
+def add_event_full(event: str, start_time: str, end_time: Optional[str] = None,
+                   location: Optional[str] = None, reminder_minutes: int = 15,
+                   repeat: Optional[str] = None, importance: str = "normal",
+                   repeat_count: int = 0, notified: int = 0, isStop: int = 0) -> int:
+    """
+    Insert event with all columns in one statement (used by the NLP path,
+    which previously did add_event + a separate UPDATE in a second connection).
+    """
+    next_iso = _compute_next_notify_iso(start_time, reminder_minutes)
+    with _write_lock:
+        conn = _get_conn()
+        cur = conn.cursor()
+        cur.execute("""
+        INSERT INTO events (event, start_time, end_time, location, reminder_minutes,
+                            notified, importance, repeat_count, isStop, repeat,
+                            next_notify, pending_auto_mark)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+        """, (event, start_time, end_time, location, reminder_minutes,
+              notified, importance, repeat_count, isStop, repeat, next_iso))
+        conn.commit()
+        _bump_version()
+        return cur.lastrowid
 
 
-def get_event(event_id: int) -> Optional[Dict]:
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        conn.row_factory = sqlite3.Row
+def add_events_bulk(rows: List[tuple]) -> List[int]:
+    """
+    Insert many events in one transaction. Each row is
+    (event, start_time, end_time, location, reminder_minutes, repeat).
+    Returns the inserted row ids.
+    """
+    prepared = []
+    for (event, start_time, end_time, location, reminder_minutes, repeat) in rows:
+        next_iso = _compute_next_notify_iso(start_time, reminder_minutes)
+        prepared.append((event, start_time, end_time, location, reminder_minutes, repeat, next_iso))
+    ids = []
+    with _write_lock:
+        conn = _get_conn()
         cur = conn.cursor()
-        cur.execute("SELECT * FROM events WHERE id = ?", (event_id,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        cur.execute("BEGIN")
+        for row in prepared:
+            cur.execute("""
+            INSERT INTO events (event, start_time, end_time, location, reminder_minutes, notified, repeat, next_notify)
+            VALUES (?, ?, ?, ?, ?, 0, ?, ?)
+            """, row)
+            ids.append(cur.lastrowid)
+        conn.commit()
+        _bump_version()
+    return ids
 
 
-def list_events() -> List[Dict]:
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM events ORDER BY start_time")
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
+def get_event(event_id: int) -> Optional[EventRow]:
+    cur = _get_conn().cursor()
+    cur.execute("SELECT * FROM events WHERE id = ?", (event_id,))
+    return cur.fetchone()
+
+
+def list_events() -> List[EventRow]:
+    cur = _get_conn().cursor()
+    cur.execute("SELECT * FROM events ORDER BY start_time")
+    return cur.fetchall()
+
+
+def list_events_between(start_iso: str, end_iso: str) -> List[EventRow]:
+    """
+    Events with start_time in [start_iso, end_iso), using the start_time index
+    instead of a full scan + Python-side filter.
+    """
+    cur = _get_conn().cursor()
+    cur.execute("""
+    SELECT * FROM events WHERE start_time >= ? AND start_time < ? ORDER BY start_time
+    """, (start_iso, end_iso))
+    return cur.fetchall()
+
+
+def iter_events():
+    """
+    Yield events one row at a time (server-side cursor) ordered by start_time.
+    Lets exports stream without materializing the whole table.
+    """
+    cur = _get_conn().cursor()
+    cur.execute("SELECT * FROM events ORDER BY start_time")
+    for row in cur:
+        yield dict(row)
+
+
+def get_pending_notifications(now_iso: str) -> List[EventRow]:
+    """
+    Events whose next_notify is due — the reminder loop's entry point.
+    Uses the partial next_notify index instead of scanning every event.
+    """
+    cur = _get_conn().cursor()
+    cur.execute("""
+    SELECT * FROM events
+    WHERE notified = 0 AND isStop = 0 AND next_notify IS NOT NULL AND next_notify <= ?
+    ORDER BY next_notify
+    """, (now_iso,))
+    return cur.fetchall()
+
+
+def get_next_notify_iso() -> Optional[str]:
+    """
+    Earliest pending next_notify, or None when nothing is scheduled.
+    Lets the reminder thread sleep until the actual deadline (the partial
+    index makes this a single index probe).
+    """
+    cur = _get_conn().cursor()
+    cur.execute("""
+    SELECT MIN(next_notify) AS nn FROM events
+    WHERE notified = 0 AND isStop = 0 AND next_notify IS NOT NULL
+    """)
+    row = cur.fetchone()
+    return row["nn"] if row else None
+
+
+def search_events(q: str) -> List[EventRow]:
+    """
+    Case-insensitive substring search over event name and location,
+    done in the SQLite VM instead of a Python scan.
+    """
+    needle = q.lower().strip()
+    cur = _get_conn().cursor()
+    cur.execute("""
+    SELECT * FROM events
+    WHERE instr(ulower(event), ?) OR instr(ulower(coalesce(location, '')), ?)
+    ORDER BY start_time
+    """, (needle, needle))
+    return cur.fetchall()
 
 
 def mark_notified(event_id: int):
@@ -118,26 +342,101 @@ def mark_notified(event_id: int):
     Mark event as notified and clear next_notify/pending_auto_mark.
     For repeating events, reminder loop will handle rescheduling.
     """
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        cur = conn.cursor()
-        cur.execute("UPDATE events SET notified = 1, next_notify = NULL, pending_auto_mark = 0 WHERE id = ?", (event_id,))
+    with _write_lock:
+        conn = _get_conn()
+        conn.execute("UPDATE events SET notified = 1, next_notify = NULL, pending_auto_mark = 0 WHERE id = ?", (event_id,))
         conn.commit()
+        _bump_version()
+
+
+def record_notification(event_id: int, max_repeat: int, followup_iso: Optional[str]) -> int:
+    """
+    Post-notification bookkeeping for the reminder loop: bump repeat_count
+    (UPDATE..RETURNING folds the old UPDATE + SELECT) and, when more repeats
+    remain, schedule the follow-up next_notify — all in one transaction and
+    one commit instead of the previous three. Returns the new repeat_count.
+    """
+    with _write_lock:
+        conn = _get_conn()
+        cur = conn.execute(
+            "UPDATE events SET repeat_count = repeat_count + 1 WHERE id = ? RETURNING repeat_count",
+            (event_id,))
+        row = cur.fetchone()
+        rc = row[0] if row else 0
+        if rc < max_repeat and followup_iso:
+            conn.execute("UPDATE events SET next_notify = ? WHERE id = ?",
+                         (followup_iso, event_id))
+        conn.commit()
+        _bump_version()
+        return rc
+
+
+def mark_done(event_id: int):
+    """
+    Stop an event and mark it notified in one statement — replaces the
+    update_event_field("isStop", 1) + mark_notified pair (one commit, not two).
+    """
+    with _write_lock:
+        conn = _get_conn()
+        conn.execute("""
+        UPDATE events SET isStop = 1, notified = 1, next_notify = NULL, pending_auto_mark = 0 WHERE id = ?
+        """, (event_id,))
+        conn.commit()
+        _bump_version()
+
+
+def reset_event(event_id: int):
+    """Re-activate an event: clear stop/notified/repeat state in one statement."""
+    with _write_lock:
+        conn = _get_conn()
+        conn.execute("""
+        UPDATE events SET isStop = 0, repeat_count = 0, notified = 0, pending_auto_mark = 0 WHERE id = ?
+        """, (event_id,))
+        conn.commit()
+        _bump_version()
 
 
 def delete_event(event_id: int):
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM events WHERE id = ?", (event_id,))
+    with _write_lock:
+        conn = _get_conn()
+        conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
         conn.commit()
+        _bump_version()
+
+
+# one fixed SQL string per updatable field, so the connection's statement
+# cache always hits instead of seeing freshly formatted query text
+_UPDATE_FIELD_SQL = {
+    field: f"UPDATE events SET {field} = ? WHERE id = ?"
+    for field in ("event", "start_time", "end_time", "location", "reminder_minutes",
+                  "notified", "importance", "repeat_count", "isStop", "next_notify",
+                  "repeat", "pending_auto_mark")
+}
+
+
+def update_event_fields(event_id, **fields):
+    """
+    Update several fields in one UPDATE statement / one commit,
+    instead of N update_event_field calls.
+    """
+    bad = set(fields) - set(_UPDATE_FIELD_SQL)
+    if bad:
+        raise ValueError(f"Fields {sorted(bad)} not allowed to update.")
+    sets = ", ".join(f"{k} = ?" for k in fields)
+    vals = list(fields.values()) + [event_id]
+    with _write_lock:
+        conn = _get_conn()
+        conn.execute(f"UPDATE events SET {sets} WHERE id = ?", vals)
+        conn.commit()
+        _bump_version()
 
 
 def update_event_field(event_id, field, value):
-    allowed = {"event", "start_time", "end_time", "location", "reminder_minutes",
-               "notified", "importance", "repeat_count", "isStop", "next_notify",
-               "repeat", "pending_auto_mark"}
-    if field not in allowed:
+    sql = _UPDATE_FIELD_SQL.get(field)
+    if sql is None:
         raise ValueError(f"Field {field} not allowed to update.")
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        cur = conn.cursor()
-        cur.execute(f"UPDATE events SET {field} = ? WHERE id = ?", (value, event_id))
+    with _write_lock:
+        conn = _get_conn()
+        conn.execute(sql, (value, event_id))
         conn.commit()
+        _bump_version()
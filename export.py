@@ -3,31 +3,61 @@
 Export functions: JSON and ICS (iCalendar).
 """
 import json
-from ics import Calendar, Event
-from db import list_events
-from dateutil import parser
+from datetime import timezone
+from db import iter_events, _parse_iso_dt
+
+try:
+    import orjson
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+
 
 def export_json(path="events_export.json"):
-    events = list_events()
+    # stream row by row so the full table is never held in memory
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(events, f, ensure_ascii=False, indent=2)
+        f.write("[")
+        first = True
+        for ev in iter_events():
+            if not first:
+                f.write(",\n")
+            f.write(_dumps(ev))
+            first = False
+        f.write("]")
     return path
 
+def _ics_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _ics_dt(iso: str) -> str:
+    dt = _parse_iso_dt(iso)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+        return dt.strftime("%Y%m%dT%H%M%SZ")
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+
 def export_ics(path="events_export.ics"):
-    cal = Calendar()
-    events = list_events()
-    for ev in events:
-        e = Event()
-        e.name = ev.get("event") or ""
-        try:
-            e.begin = parser.isoparse(ev["start_time"])
-            if ev.get("end_time"):
-                e.end = parser.isoparse(ev["end_time"])
-        except Exception:
-            # ignore parse errors
-            pass
-        e.location = ev.get("location") or ""
-        cal.events.add(e)
+    # write ICS text directly, one event at a time — no per-event Event()
+    # objects and no whole-calendar string held in memory
     with open(path, "w", encoding="utf-8") as f:
-        f.writelines(cal)
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//schedule_assistant//EN\r\n")
+        for ev in iter_events():
+            f.write("BEGIN:VEVENT\r\n")
+            f.write(f"UID:{ev['id']}@schedule_assistant\r\n")
+            f.write(f"SUMMARY:{_ics_escape(ev.get('event') or '')}\r\n")
+            try:
+                f.write(f"DTSTART:{_ics_dt(ev['start_time'])}\r\n")
+                if ev.get("end_time"):
+                    f.write(f"DTEND:{_ics_dt(ev['end_time'])}\r\n")
+            except Exception:
+                # ignore parse errors
+                pass
+            if ev.get("location"):
+                f.write(f"LOCATION:{_ics_escape(ev['location'])}\r\n")
+            f.write("END:VEVENT\r\n")
+        f.write("END:VCALENDAR\r\n")
     return path
@@ -1,10 +1,17 @@
 # main.py (UI đẹp — bản sửa hoàn chỉnh)
+import functools
+from collections import defaultdict
 import streamlit as st
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timedelta
 import pytz
-import sqlite3
 import calendar
 
+try:
+    import ciso8601
+    _parse_iso = ciso8601.parse_datetime
+except ImportError:
+    _parse_iso = datetime.fromisoformat
+
 import db, export
 import nlp as nlp_module
 from reminder import start_reminder_thread, get_streamlit_alerts
@@ -21,6 +28,17 @@ st.set_page_config(page_title="Personal Schedule Assistant", layout="centered")
 st.title("🧭 Trợ lý quản lý lịch trình thông minh")
 
 LOCAL_TZ = pytz.timezone("Asia/Ho_Chi_Minh")
+FIXED_LOCAL = db.FIXED_LOCAL  # cached +07:00 offset, cheaper than pytz.localize
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_local(iso: str) -> datetime:
+    """Parse an ISO start_time into a local-tz-aware datetime, cached across reruns."""
+    dt = _parse_iso(iso)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=FIXED_LOCAL)
+    # no astimezone: values written by this app already carry the local offset
+    return dt
 
 # ---------------------------
 # POPUP ALERTS
@@ -49,30 +67,18 @@ txt = st.text_area(
 if st.button("Phân tích câu (NLP)"):
     parsed = nlp_module.parse_text(txt)
     if parsed:
-        new_id = db.add_event(
+        db.add_event_full(
             parsed["event"],
             parsed["start_time"],
             parsed.get("end_time"),
             parsed.get("location"),
             parsed.get("reminder_minutes", 15),
-            parsed.get("repeat", None)
+            parsed.get("repeat", None),
+            parsed.get("importance", "normal"),
+            parsed.get("repeat_count", 0),
+            parsed.get("notified", 0),
+            parsed.get("isStop", 0)
         )
-
-        with sqlite3.connect("events.db") as conn:
-            cur = conn.cursor()
-            cur.execute("""
-                UPDATE events SET
-                    importance=?, repeat_count=?, notified=?,
-                    isStop=?, pending_auto_mark=0
-                WHERE id=?
-            """, (
-                parsed.get("importance", "normal"),
-                parsed.get("repeat_count", 0),
-                parsed.get("notified", 0),
-                parsed.get("isStop", 0),
-                new_id
-            ))
-            conn.commit()
         st.success("✨ NLP hiểu và thêm sự kiện thành công!")
         st.rerun()
     else:
@@ -114,21 +120,35 @@ with colm3:
             st.session_state.cal_month += 1
         st.rerun()
 
-events_all = db.list_events()
-
-# build "days that have events"
-days_with_events = set()
-for e in events_all:
+def _month_bounds_iso(year, month):
+    start = LOCAL_TZ.localize(datetime(year, month, 1))
+    if month == 12:
+        end = LOCAL_TZ.localize(datetime(year + 1, 1, 1))
+    else:
+        end = LOCAL_TZ.localize(datetime(year, month + 1, 1))
+    return start.isoformat(), end.isoformat()
+
+
+# build a day -> events index once per rerun — the calendar dots and the
+# selected-day list both read from it instead of re-scanning events
+m_start, m_end = _month_bounds_iso(st.session_state.cal_year, st.session_state.cal_month)
+# keyed by the db write-version: rapid reruns with no writes in between
+# reuse the cached rows instead of re-querying
+_month_key = (db.get_version(), m_start, m_end)
+if st.session_state.get("month_cache_key") != _month_key:
+    st.session_state.month_events = db.list_events_between(m_start, m_end)
+    st.session_state.month_cache_key = _month_key
+events_month = st.session_state.month_events
+
+events_by_day = defaultdict(list)
+for e in events_month:
     try:
-        dt = datetime.fromisoformat(e["start_time"])
-        if dt.tzinfo is None:
-            dt = LOCAL_TZ.localize(dt)
-        dt = dt.astimezone(LOCAL_TZ)
-        if dt.year == st.session_state.cal_year and dt.month == st.session_state.cal_month:
-            days_with_events.add(dt.day)
+        events_by_day[_parse_local(e["start_time"]).date()].append(e)
     except:
         pass
 
+days_with_events = {d.day for d in events_by_day}
+
 # calendar rows
 cal = calendar.monthcalendar(st.session_state.cal_year, st.session_state.cal_month)
 
@@ -161,17 +181,12 @@ search_q = st.text_input("Tìm kiếm (theo tên / địa điểm)...")
 selected = st.session_state.get("selected_day", None)
 if selected:
     st.markdown(f"### Sự kiện ngày **{selected.strftime('%d/%m/%Y')}**")
-    events_for_day = []
-
-    for e in events_all:
-        try:
-            dt = datetime.fromisoformat(e["start_time"])
-            if dt.tzinfo is None:
-                dt = LOCAL_TZ.localize(dt)
-            if dt.date() == selected:
-                events_for_day.append(e)
-        except:
-            continue
+    if (selected.year, selected.month) == (st.session_state.cal_year, st.session_state.cal_month):
+        events_for_day = events_by_day[selected]
+    else:
+        d_start = LOCAL_TZ.localize(datetime.combine(selected, time(0, 0)))
+        d_end = d_start + timedelta(days=1)
+        events_for_day = db.list_events_between(d_start.isoformat(), d_end.isoformat())
 
     if not events_for_day:
         st.info("Không có sự kiện trong ngày này.")
@@ -198,8 +213,7 @@ if selected:
                 st.rerun()
 
             if colC.button("✔️ Đã nhắc", key=f"mark_day_{ev['id']}"):
-                db.update_event_field(ev["id"], "isStop", 1)
-                db.mark_notified(ev["id"])
+                db.mark_done(ev["id"])
                 st.rerun()
 
 # ---------------------------
@@ -208,10 +222,7 @@ if selected:
 if search_q:
     q = search_q.lower().strip()
     st.markdown(f"### 🔍 Kết quả tìm kiếm: **{q}**")
-    lst = []
-    for ev in events_all:
-        if q in (ev['event'] or "").lower() or q in (ev.get('location') or "").lower():
-            lst.append(ev)
+    lst = db.search_events(q)
 
     if not lst:
         st.info("Không tìm thấy kết quả.")
@@ -227,8 +238,7 @@ if search_q:
                 db.delete_event(ev["id"])
                 st.rerun()
             if c3.button("✔️ Đã nhắc", key=f"mark_s_{ev['id']}"):
-                db.update_event_field(ev["id"], "isStop", 1)
-                db.mark_notified(ev["id"])
+                db.mark_done(ev["id"])
                 st.rerun()
 
 # ---------------------------
@@ -240,10 +250,7 @@ if st.session_state.get("editing"):
     st.markdown(f"### ✏️ Chỉnh sửa sự kiện ID {ev['id']}")
 
     # parse start_time
-    dt = datetime.fromisoformat(ev["start_time"])
-    if dt.tzinfo is None:
-        dt = LOCAL_TZ.localize(dt)
-    dt = dt.astimezone(LOCAL_TZ)
+    dt = _parse_local(ev["start_time"])
 
     new_event = st.text_input("Tên sự kiện", ev["event"])
     new_date = st.date_input("Ngày", dt.date())
@@ -257,18 +264,14 @@ if st.session_state.get("editing"):
         dt_new = datetime.combine(new_date, new_time)
         dt_new = LOCAL_TZ.localize(dt_new)
 
-        with sqlite3.connect("events.db") as conn:
-            cur = conn.cursor()
-            cur.execute("""
-                UPDATE events SET
-                    event=?, start_time=?, location=?, reminder_minutes=?, importance=?, repeat=?,
-                    isStop=0, notified=0, repeat_count=0, pending_auto_mark=0, next_notify=NULL
-                WHERE id=?
-            """, (
-                new_event, dt_new.isoformat(), new_location,
-                int(new_rem), new_imp, new_repeat, ev["id"]
-            ))
-            conn.commit()
+        # recompute next_notify so the reminder loop's due query picks this up
+        new_next = db._compute_next_notify_iso(dt_new.isoformat(), int(new_rem))
+        db.update_event_fields(
+            ev["id"],
+            event=new_event, start_time=dt_new.isoformat(), location=new_location,
+            reminder_minutes=int(new_rem), importance=new_imp, repeat=new_repeat,
+            isStop=0, notified=0, repeat_count=0, pending_auto_mark=0, next_notify=new_next
+        )
 
         st.success("Đã lưu chỉnh sửa.")
         st.session_state.editing = None
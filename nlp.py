@@ -7,23 +7,43 @@
 
 import re
 import unicodedata
+from functools import lru_cache
 from typing import Optional, Dict
 from datetime import datetime, timedelta, time, date
-from dateutil import parser as dateparser
-import pytz
+from zoneinfo import ZoneInfo
 
-LOCAL_TZ = pytz.timezone("Asia/Ho_Chi_Minh")
+try:
+    import ahocorasick  # pyahocorasick — optional C multi-pattern matcher
+except ImportError:
+    ahocorasick = None
+
+# stdlib zoneinfo: attaching it is a plain replace(tzinfo=...), much cheaper
+# than pytz's localize (VN has had no DST since 1975, so no fold concerns)
+LOCAL_TZ = ZoneInfo("Asia/Ho_Chi_Minh")
 
 # -------------------------
 # Helpers
 # -------------------------
+# translation table covering the precomposed Latin range Vietnamese uses
+# (À..ỹ), built once by NFKD — note "đ" has no decomposition and stays "đ",
+# same as the old per-call normalize did; stray combining marks are dropped
+# so NFD input behaves identically too
+_DIACRITIC_TABLE = {}
+for _cp in range(0x00C0, 0x1EFA):
+    _base = "".join(c for c in unicodedata.normalize('NFKD', chr(_cp))
+                    if not unicodedata.combining(c))
+    if _base != chr(_cp):
+        _DIACRITIC_TABLE[_cp] = _base
+for _cp in range(0x0300, 0x0370):
+    _DIACRITIC_TABLE[_cp] = None
+
+
 def remove_diacritics(s: str) -> str:
-    nfkd_form = unicodedata.normalize('NFKD', s)
-    return "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+    return s.translate(_DIACRITIC_TABLE)
 
 def to_iso(dt: datetime) -> str:
     if dt.tzinfo is None:
-        dt = LOCAL_TZ.localize(dt)
+        dt = dt.replace(tzinfo=LOCAL_TZ)
     else:
         dt = dt.astimezone(LOCAL_TZ)
     return dt.replace(microsecond=0).isoformat()
@@ -167,43 +187,216 @@ VN_NUM = {
     "sau muoi": 60,
 }
 
+def _build_ascii_lookup() -> dict:
+    """Flatten ASCII_MAP (keys + their no-diacritics variants) into one dict.
+
+    Longest keys first, first writer wins — the same precedence the old
+    per-key sub cascade had."""
+    lookup = {}
+    for k in sorted(ASCII_MAP, key=len, reverse=True):
+        v = ASCII_MAP[k]
+        for variant in (k, remove_diacritics(k)):
+            if variant not in lookup:
+                lookup[variant] = v
+    return lookup
+
+_ASCII_LOOKUP = _build_ascii_lookup()
+# one alternation over every variant (longest first), same word-boundary
+# guards as before; the whole map is applied in a single scan instead of
+# two re.sub passes per key
+_ASCII_RE = re.compile(
+    r'(?<!\w)(' + '|'.join(re.escape(k) for k in _ASCII_LOOKUP) + r')(?!\w)')
+
+# trie-based variant of the same scan: no alternation backtracking at all
+if ahocorasick is not None:
+    _ASCII_AUTOMATON = ahocorasick.Automaton()
+    for _k, _v in _ASCII_LOOKUP.items():
+        _ASCII_AUTOMATON.add_word(_k, (len(_k), _v))
+    _ASCII_AUTOMATON.make_automaton()
+else:
+    _ASCII_AUTOMATON = None
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == '_'
+
+
+def _automaton_sub(automaton, s: str) -> str:
+    """Replace every dictionary hit in s, leftmost-longest, keeping the
+    (?<!\\w)...(?!\\w) word-boundary semantics of the regex equivalents."""
+    hits = []
+    for end, (klen, val) in automaton.iter(s):
+        start = end - klen + 1
+        if start > 0 and _is_word_char(s[start - 1]):
+            continue
+        if end + 1 < len(s) and _is_word_char(s[end + 1]):
+            continue
+        hits.append((start, end, val))
+    if not hits:
+        return s
+    hits.sort(key=lambda h: (h[0], h[0] - h[1]))
+    out = []
+    pos = 0
+    for start, end, val in hits:
+        if start < pos:
+            continue
+        out.append(s[pos:start])
+        out.append(val)
+        pos = end + 1
+    out.append(s[pos:])
+    return "".join(out)
+
+
 def apply_ascii_map(s: str) -> str:
     """Apply ASCII_MAP robustly. Accept both normal and no-diacritics input."""
-    txt = s
-    # First handle larger/longer keys first (sort by length desc)
-    keys = sorted(ASCII_MAP.keys(), key=lambda x: len(x), reverse=True)
-    for k in keys:
-        v = ASCII_MAP[k]
-        # match both original key and its no-diacritics variant
-        k_nd = remove_diacritics(k)
-        # Replace occurrences with word boundary guard (avoid mid-word replacements)
-        pattern1 = rf'(?<!\w){re.escape(k)}(?!\w)'
-        pattern2 = rf'(?<!\w){re.escape(k_nd)}(?!\w)'
-        txt = re.sub(pattern1, v, txt)
-        if k_nd != k:
-            txt = re.sub(pattern2, v, txt)
-    return txt
+    if _ASCII_AUTOMATON is not None:
+        return _automaton_sub(_ASCII_AUTOMATON, s)
+    return _ASCII_RE.sub(lambda m: _ASCII_LOOKUP[m.group(1)], s)
+
+# single alternation over all number words (longest first so "mười hai"
+# beats "mười"+"hai"); one linear scan replaces 27 per-key re.sub passes
+_VN_NUM_RE = re.compile(
+    r'(?<!\w)(' + '|'.join(re.escape(k) for k in sorted(VN_NUM, key=len, reverse=True)) + r')(?!\w)')
+
+# Aho-Corasick automaton over the same dictionary: linear scan with no
+# backtracking at all; used when pyahocorasick is installed
+if ahocorasick is not None:
+    _VN_AUTOMATON = ahocorasick.Automaton()
+    for _k, _v in VN_NUM.items():
+        _VN_AUTOMATON.add_word(_k, (len(_k), str(_v)))
+    _VN_AUTOMATON.make_automaton()
+else:
+    _VN_AUTOMATON = None
+
 
 def replace_vn_num(s: str) -> str:
-    txt = s
-    # longest-first
-    for k in sorted(VN_NUM.keys(), key=len, reverse=True):
-        txt = re.sub(rf'(?<!\w){re.escape(k)}(?!\w)', str(VN_NUM[k]), txt)
-    return txt
+    if _VN_AUTOMATON is None:
+        return _VN_NUM_RE.sub(lambda m: str(VN_NUM[m.group(1)]), s)
+    return _automaton_sub(_VN_AUTOMATON, s)
 
+# -------------------------
+# Precompiled patterns (compiled once at import; every parse reuses them
+# instead of going through re's per-call cache lookup)
+# -------------------------
+_RE_MOT_GUARD = re.compile(r'\bm[ôo]́?t\b')
+_RE_WS = re.compile(r"\s+")
+
+# '.'→':' plus punctuation-to-space in a single C-level pass; the runs of
+# spaces this leaves are collapsed by the _RE_WS sub that follows anyway
+_NORM_TRANS = str.maketrans({'.': ':', ',': ' ', ';': ' ', '(': ' ', ')': ' '})
+
+# colon form keeps its own pattern (it outranks the giờ forms anywhere in
+# the text); the two giờ shapes share one pattern (mn set = "10h30", absent
+# = bare "10h"), and one pattern covers every time-of-day word — so
+# extract_time does at most three scans instead of six
+_RE_HM_COLON = re.compile(r'\b(\d{1,2}):(\d{1,2})\b')
+_RE_GIO = re.compile(r'\b(?P<h>\d{1,2})\s*(?:h|giờ)\s*(?P<mn>\d{1,2})?\b')
+_RE_TOD = re.compile(r'\b(?:(?P<sang>sáng)|(?P<trua>trưa)|(?P<cte>chiều|tối|đêm))\b')
+
+_RE_TAM_CHIEU = re.compile(r'\btầm chiều\b|\btam chieu\b')
+_RE_TAM_TOI = re.compile(r'\btầm tối\b|\btam toi\b')
+
+_RE_TUAN_SAU = re.compile(r'tuần sau|tuan sau|tuần tới|tuan toi')
+_RE_CUOI_TUAN = re.compile(r'cuối tuần|cuoi tuan')
+_RE_DAU_TUAN = re.compile(r'đầu tuần|dau tuan')
+_RE_THANG_SAU = re.compile(r'tháng sau|thang sau')
+
+_RE_HOM_NAY = re.compile(r'\bhôm nay\b|\bhom nay\b')
+_RE_MAI = re.compile(r'\bmai\b')
+_RE_MOT_DAY = re.compile(r'\b(mốt|mot|mót|môt)\b')
+_RE_NGAY_MOT = re.compile(r'(ngày|ngay)\s+(mốt|mot|mót|môt)\b')
+_RE_N_NGAY_NUA = re.compile(r'(\d+)\s*ngày nua|\b(\d+)\s*ngay nua')
+_RE_DATE_DMY = re.compile(r'(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?')
+
+_RE_REMINDER = re.compile(r'nhắc(?: tôi| tui)?\s*(?:trước)?\s*(\d+)\s*(phút|phut|p|ph|giờ|g|h|ngày|ngay)?')
+
+# all four repeat shapes in one pattern; extract_repeat resolves the same
+# daily > weekly > monthly > every_N priority the old search chain had
+_RE_REPEAT = re.compile(
+    r'(?P<d>mỗi ngày|moi ngay|hàng ngày|hang ngay)'
+    r'|(?P<w>mỗi tuần|moi tuan|hang tuan|hàng tuần)'
+    r'|(?P<mo>mỗi tháng|moi thang|hang thang|hàng tháng)'
+    r'|moi\s+(?P<n>\d+)\s*(?P<u>ngay|tuan|thang)')
+
+_RE_INTENT_VERB = re.compile(r'(?:muon|can|dinh|hay|giup|tao|tao cho|tao ra)\s+(.*?)(?:,|nhac|luc|o|tai|$)')
+_RE_INTENT_PRONOUN = re.compile(r'(?:toi|tui|tao|minh)\s+(.*?)(?:,|nhac|luc|o|tai|$)')
+# same single-pass idea for the intent-candidate cleanup (no-diacritics text)
+_RE_CAND_CLEAN = re.compile(
+    r'\b(?:toi|tui|tao|minh)\b'
+    r'|\b(?:nhac|truoc|phut|gio|h|ngay)\b.*'
+    r'|\bluc\b.*'
+    r'|(?:o|tai)\s+.*')
+
+# all the "noise" token classes stripped from event names, fused into one
+# alternation so the string is scanned (and reallocated) once instead of
+# seven times; branch order mirrors the old sub cascade
+_RE_CLEAN_ALL = re.compile(
+    r'\b(?:nhắc|nhac|tao|tạo|sự kiện|su kien|hãy|hay|giup|giúp)\b'
+    r'|\d+\s*(?:phút|phut|p|ph|giờ|gio|g|h)\s*nữa'
+    r'|nhắc.*trước.*'
+    r'|\blúc\b.*'
+    r'|(?:o|tai)\s+[^,.;]+'
+    r'|(?:hôm nay|hom nay|mai|sáng|sang|trưa|trua|chiều|chieu|tối|toi|đêm|dem)'
+    r'|\d{1,2}[:h]\d{0,2}')
+
+_RE_LOC = re.compile(r'\b(?:ở|tại|o|tai)\s+([^,.;]+)', flags=re.IGNORECASE)
+_RE_LOC_TAIL = re.compile(r'(nhé|giúp|giup|giùm).*')
+_RE_LOC_ND = re.compile(r'\b(?:o|tai)\s+([^,.;]+)')
+
+_RE_DOUBLE_REL = re.compile(
+    r'(\d+)\s*(phút|phut|p)\s*(?:nữa|nua)\s+(.+?)\s*(?:,|\s+)?nhắc\s*(?:trước\s*)?(\d+)',
+    flags=re.IGNORECASE)
+_RE_SIMPLE_REL = re.compile(r'(\d+)\s*(phút|phut|p)\s*(?:nữa|nua)\s+(.+)')
+_RE_EV_TAIL = re.compile(r'\b(nhắc|truoc|trước|phut|p|giờ|gio)\b.*')
+_RE_REL_MIN = re.compile(r'(\d+)\s*(phút|phut|p)\s*(?:nữa|nua)')
+_RE_REL_HR = re.compile(r'(\d+)\s*(giờ|gio|g|h)\s*(?:nữa|nua)')
+_RE_REL_FRAG = re.compile(r'\d+\s*(phút|phut|p|ph|giờ|gio|g|h)\s*nữa')
+_RE_IMPORTANCE = re.compile(
+    r'(?P<crit>cực quan trọng|khan cap|khan cấp|cuc quan trong)'
+    r'|(?P<imp>quan trọng|uu tiên|uu tien)')
+
+# explicit formats tried by the last-resort fallback in parse_text
+_FALLBACK_FORMATS = ("%d/%m/%Y %H:%M", "%d/%m/%Y", "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+# substrings that can carry any time/date/reminder signal (accented and
+# bare forms); an input with no digit and none of these cannot produce a
+# start_time, so parse_text rejects it before norm and the extractors run
+_TRIGGERS = (
+    'nhắc', 'nhac', 'mai', 'mốt', 'mot', 'tuần', 'tuan', 'tháng', 'thang',
+    'giờ', 'gio', 'sáng', 'sang', 'trưa', 'trua', 'chiều', 'chieu',
+    'tối', 'toi', 'đêm', 'dem', 'hôm', 'hom', 'thứ', 'thu', 'cn',
+    'nhật', 'nhat', 'nữa', 'nua', 'tầm', 'tam', 'khuya', 'lúc', 'luc',
+)
+
+# one tagging pass over the normalized text: each group is a superset of
+# what the corresponding extractor can match, so _parse_structure runs an
+# extractor only when its trigger actually occurs instead of letting every
+# helper re-scan the full string
+_TRIGGER_RE = re.compile(
+    r'(?P<rel>\d+\s*(?:phút|phut|p|ph|giờ|gio|g|h)\s*(?:nữa|nua))'
+    r'|(?P<num>\d)'
+    r'|(?P<nhac>nhắc)'
+    r'|(?P<tam>tầm|tam|giữa|giu a)'
+    r'|(?P<rep>mỗi|moi|hàng|hang)'
+    r'|(?P<imp>quan tr|uu ti|khan c)')
+
+
+@lru_cache(maxsize=2048)
 def norm(raw: str) -> str:
-    """Normalization used for time/date parsing: do NOT remove diacritics globally."""
+    """Normalization used for time/date parsing: do NOT remove diacritics globally.
+
+    Pure function of the input text, so it is memoized — re-parsing the same
+    utterance (retries, reruns) skips the whole map/replace pipeline."""
     t = raw.lower().strip()
     # protect "mốt" so ascii-map won't break it
-    t = re.sub(r'\bm[ôo]́?t\b', '__MOT__', t)
+    t = _RE_MOT_GUARD.sub('__MOT__', t)
     # apply ascii map (handles both no-diacritics and ascii shortcut)
     t = apply_ascii_map(t)
     # replace numbers words
     t = replace_vn_num(t)
-    # common punctuation
-    t = t.replace(".", ":")
-    t = re.sub(r"[,;()]+", " ", t)
-    t = re.sub(r"\s+", " ", t).strip()
+    # common punctuation (one translate pass instead of replace + regex)
+    t = t.translate(_NORM_TRANS)
+    t = _RE_WS.sub(" ", t).strip()
     # restore protected mốt
     t = t.replace('__MOT__', 'mốt')
 
@@ -213,46 +406,42 @@ def norm(raw: str) -> str:
 # Time extraction
 # -------------------------
 def extract_time(t: str) -> Optional[tuple]:
-    # 24h style 10:30
-    m = re.search(r'\b(\d{1,2}):(\d{1,2})\b', t)
-    if m:
-        h = int(m.group(1)); mn = int(m.group(2))
-        return h, mn
-
-    # 10h30 or "10 h 30" or "10 giờ 30"
-    m = re.search(r'\b(\d{1,2})\s*(?:h|giờ)\s*(\d{1,2})\b', t)
-    if m:
-        h = int(m.group(1)); mn = int(m.group(2))
-        # consider time of day words
-        if re.search(r'\bsáng\b', t) and h == 12:
-            h = 0
-        if re.search(r'\btrưa\b', t) and h < 12:
-            h = 12
-        if re.search(r'\b(chiều|tối|đêm)\b', t) and h < 12:
-            h += 12
-        return h, mn
-
-    # 10h, 10 h, 10 giờ
-    m = re.search(r'\b(\d{1,2})\s*(?:h|giờ)\b', t)
+    # 24h style 10:30 — outranks the giờ forms, no time-of-day adjustment
+    m = _RE_HM_COLON.search(t)
     if m:
-        h = int(m.group(1)); mn = 0
-        if re.search(r'\bsáng\b', t) and h == 12:
-            h = 0
-        if re.search(r'\btrưa\b', t) and h < 12:
-            h = 12
-        if re.search(r'\b(chiều|tối|đêm)\b', t) and h < 12:
-            h += 12
-        return h, mn
-
-    return None
+        return int(m.group(1)), int(m.group(2))
+
+    # "10h30" / "10 giờ 30" (with minutes) beats a bare "10h" anywhere
+    gio_full = gio_plain = None
+    for m in _RE_GIO.finditer(t):
+        if m.group('mn') is not None:
+            gio_full = m
+            break
+        if gio_plain is None:
+            gio_plain = m
+
+    m = gio_full or gio_plain
+    if m is None:
+        return None
+    h = int(m.group('h')); mn = int(m.group('mn') or 0)
+
+    # consider time of day words (single scan for all three classes)
+    tods = {w.lastgroup for w in _RE_TOD.finditer(t)}
+    if 'sang' in tods and h == 12:
+        h = 0
+    if 'trua' in tods and h < 12:
+        h = 12
+    if 'cte' in tods and h < 12:
+        h += 12
+    return h, mn
 
 # -------------------------
 # Natural time guesses (tầm chiều / tầm tối)
 # -------------------------
 def guess_natural_time(t: str) -> Optional[time]:
-    if re.search(r'\btầm chiều\b|\btam chieu\b|\btam chieu\b', t):
+    if _RE_TAM_CHIEU.search(t):
         return time(15, 0)
-    if re.search(r'\btầm tối\b|\btam toi\b', t):
+    if _RE_TAM_TOI.search(t):
         return time(19, 0)
     if 'giữa trưa' in t or 'giu a trua' in t:
         return time(12, 0)
@@ -271,25 +460,35 @@ WEEKDAY = {
     "chu nhat":6, "cn":6
 }
 
-def extract_advanced_relative_date(t: str) -> Optional[date]:
-    now = datetime.now(LOCAL_TZ).date()
+# one alternation (longest keys first, so "thu hai" wins over "hai") replaces
+# the per-key `in` scan — the text is walked once regardless of dict size
+_RE_WEEKDAY = re.compile(
+    r'\b(' + '|'.join(re.escape(k) for k in sorted(WEEKDAY, key=len, reverse=True)) + r')\b')
+
+# substring probes covering every WEEKDAY key; lets extract_date skip the
+# weekday regex entirely on the (common) inputs with no weekday mention
+_WEEKDAY_PROBES = ('th', 'cn', 'chu', 'hai', 'ba', 'tu', 'nam', 'sau', 'bay')
+
+def extract_advanced_relative_date(t: str, today: Optional[date] = None) -> Optional[date]:
+    # callers that already know "today" pass it in so one parse sees one clock
+    now = today if today is not None else datetime.now(LOCAL_TZ).date()
     wd = now.weekday()
     # tuần sau / tuần tới
-    if re.search(r'tuần sau|tuan sau|tuần tới|tuan toi', t):
+    if _RE_TUAN_SAU.search(t):
         return now + timedelta(days=7)
-    if re.search(r'cuối tuần|cuoi tuan', t):
+    if _RE_CUOI_TUAN.search(t):
         # find next saturday/sunday -> choose sunday as "cuối tuần"
         delta = (6 - wd) if wd <= 6 else 0
         if delta < 0:
             delta += 7
         return now + timedelta(days=delta)
-    if re.search(r'đầu tuần|dau tuan', t):
+    if _RE_DAU_TUAN.search(t):
         # next monday
         delta = (0 - wd) if wd <= 0 else (7 - wd)
         if delta == 0:
             delta = 7
         return now + timedelta(days=delta)
-    if re.search(r'tháng sau|thang sau', t):
+    if _RE_THANG_SAU.search(t):
         # next month same day (fallback safe)
         y = now.year; m = now.month + 1
         if m > 12:
@@ -298,38 +497,40 @@ def extract_advanced_relative_date(t: str) -> Optional[date]:
         return date(y, m, d)
     return None
 
-def extract_date(t: str) -> Optional[date]:
-    today = datetime.now(LOCAL_TZ).date()
+def extract_date(t: str, today: Optional[date] = None) -> Optional[date]:
+    if today is None:
+        today = datetime.now(LOCAL_TZ).date()
     # advanced patterns first
-    adv = extract_advanced_relative_date(t)
+    adv = extract_advanced_relative_date(t, today)
     if adv:
         return adv
 
-    if re.search(r'\bhôm nay\b|\bhom nay\b', t):
+    if _RE_HOM_NAY.search(t):
         return today
-    if re.search(r'\bmai\b', t):
+    if _RE_MAI.search(t):
         return today + timedelta(days=1)
-    if re.search(r'\b(mốt|mot|mót|môt)\b', t):
+    if _RE_MOT_DAY.search(t):
         return today + timedelta(days=2)
-    if re.search(r'(ngày|ngay)\s+(mốt|mot|mót|môt)\b', t):
+    if _RE_NGAY_MOT.search(t):
         return today + timedelta(days=2)
     # "3 ngày nữa"
-    m = re.search(r'(\d+)\s*ngày nua|\b(\d+)\s*ngay nua', t)
+    m = _RE_N_NGAY_NUA.search(t)
     if m:
         g = m.group(1) or m.group(2)
         try:
             return today + timedelta(days=int(g))
         except:
             pass
-    # weekday phrases
-    for k, wd in WEEKDAY.items():
-        if k in t:
-            delta = (wd - today.weekday() + 7) % 7
-            if delta == 0:
-                delta = 7
-            return today + timedelta(days=delta)
+    # weekday phrases (gated: cheap 'in' probes before the regex)
+    m = _RE_WEEKDAY.search(t) if any(p in t for p in _WEEKDAY_PROBES) else None
+    if m:
+        wd = WEEKDAY[m.group(1)]
+        delta = (wd - today.weekday() + 7) % 7
+        if delta == 0:
+            delta = 7
+        return today + timedelta(days=delta)
     # explicit dd/mm or dd/mm/yyyy
-    m = re.search(r'(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?', t)
+    m = _RE_DATE_DMY.search(t)
     if m:
         d = int(m.group(1)); mo = int(m.group(2)); y = m.group(3)
         if y:
@@ -346,26 +547,37 @@ def extract_date(t: str) -> Optional[date]:
 # -------------------------
 # Reminder
 # -------------------------
+_UNIT_DAY = frozenset({'ngày', 'ngay'})
+_UNIT_HR = frozenset({'giờ', 'gio', 'g', 'h'})
+
+
 def extract_reminder(t: str) -> int:
-    m = re.search(r'nhắc(?: tôi| tui)?\s*(?:trước)?\s*(\d+)\s*(phút|phut|p|ph|giờ|g|h|ngày|ngay)?', t)
+    m = _RE_REMINDER.search(t)
     if not m:
         return 15
     n = int(m.group(1))
     unit = (m.group(2) or "phút")
-    if 'ngày' in unit or 'ngay' in unit:
+    if unit in _UNIT_DAY:
         return n * 1440
-    if unit in ('giờ','gio','g','h'):
+    if unit in _UNIT_HR:
         return n * 60
     return n
 
 def extract_repeat(t: str) -> Optional[str]:
-    if re.search(r'mỗi ngày|moi ngay|hàng ngày|hang ngay', t): return "daily"
-    if re.search(r'mỗi tuần|moi tuan|hang tuan|hàng tuần|hang tuan', t): return "weekly"
-    if re.search(r'mỗi tháng|moi thang|hang thang|hàng tháng|hang thang', t): return "monthly"
+    # cheap substring gate: every repeat phrase contains one of these, and
+    # str.__contains__ is far cheaper than four regex searches that miss
+    if 'mỗi' not in t and 'moi' not in t and 'hàng' not in t and 'hang' not in t:
+        return None
+    found = {}
+    for m in _RE_REPEAT.finditer(t):
+        found.setdefault(m.lastgroup, m)
+    if 'd' in found: return "daily"
+    if 'w' in found: return "weekly"
+    if 'mo' in found: return "monthly"
     # extended patterns "mỗi 2 ngày" -> every_2_ngay
-    m = re.search(r'moi\s+(\d+)\s*(ngay|tuan|thang)', t)
-    if m:
-        return f"every_{m.group(1)}_{m.group(2)}"
+    if 'u' in found:
+        m = found['u']
+        return f"every_{m.group('n')}_{m.group('u')}"
     return None
 
 # -------------------------
@@ -375,22 +587,15 @@ def extract_event_candidate_from_intent(raw: str) -> Optional[str]:
     s = remove_diacritics(raw.lower())
     s = apply_ascii_map(s)
     s = replace_vn_num(s)
-    s = re.sub(r'\s+', ' ', s).strip()
+    s = _RE_WS.sub(' ', s).strip()
 
     # patterns for intent (no-diacritics)
-    patterns = [
-        r'(?:muon|can|dinh|hay|giup|tao|tao cho|tao ra)\s+(.*?)(?:,|nhac|luc|o|tai|$)',
-        r'(?:toi|tui|tao|minh)\s+(.*?)(?:,|nhac|luc|o|tai|$)'
-    ]
-    for p in patterns:
-        m = re.search(p, s)
+    for p in (_RE_INTENT_VERB, _RE_INTENT_PRONOUN):
+        m = p.search(s)
         if m:
             cand = m.group(1).strip()
-            cand = re.sub(r'\b(toi|tui|tao|minh)\b', '', cand)
-            cand = re.sub(r'\b(nhac|truoc|phut|gio|h|ngay)\b.*', '', cand)
-            cand = re.sub(r'\bluc\b.*', '', cand)
-            cand = re.sub(r'(o|tai)\s+.*', '', cand)
-            cand = re.sub(r'\s+', ' ', cand).strip()
+            cand = _RE_CAND_CLEAN.sub('', cand)
+            cand = _RE_WS.sub(' ', cand).strip()
             if cand:
                 # try to restore accents roughly? keep as is (no-diacritics ok)
                 return cand
@@ -401,15 +606,8 @@ def clean_event_name(t: str) -> str:
     cand = extract_event_candidate_from_intent(t)
     if cand:
         return cand.strip()
-    s = t
-    s = re.sub(r'\b(nhắc|nhac|tao|tạo|sự kiện|su kien|hãy|hay|giup|giúp)\b', '', s)
-    s = re.sub(r'\d+\s*(phút|phut|p|ph|giờ|gio|g|h)\s*nữa', '', s)
-    s = re.sub(r'nhắc.*trước.*', '', s)
-    s = re.sub(r'\blúc\b.*', '', s)
-    s = re.sub(r'(o|tai)\s+[^,.;]+', '', s)
-    s = re.sub(r'(hôm nay|hom nay|mai|sáng|sang|trưa|trua|chiều|chieu|tối|toi|đêm|dem)', '', s)
-    s = re.sub(r'\d{1,2}[:h]\d{0,2}', '', s)
-    s = re.sub(r'\s+', ' ', s).strip()
+    s = _RE_CLEAN_ALL.sub('', t)
+    s = _RE_WS.sub(' ', s).strip()
     return s if s else "Sự kiện"
 
 # -------------------------
@@ -417,14 +615,14 @@ def clean_event_name(t: str) -> str:
 # -------------------------
 def extract_location(raw: str) -> Optional[str]:
     # try accented first (original text)
-    m = re.search(r'\b(?:ở|tại|o|tai)\s+([^,.;]+)', raw, flags=re.IGNORECASE)
+    m = _RE_LOC.search(raw)
     if m:
         loc = m.group(1).strip()
-        loc = re.sub(r'(nhé|nhé|giúp|giup|giùm).*', '', loc).strip()
+        loc = _RE_LOC_TAIL.sub('', loc).strip()
         return loc
     # fallback to no-diacritics form
     s = remove_diacritics(raw.lower())
-    m2 = re.search(r'\b(?:o|tai)\s+([^,.;]+)', s)
+    m2 = _RE_LOC_ND.search(s)
     if m2:
         return m2.group(1).strip()
     return None
@@ -432,42 +630,89 @@ def extract_location(raw: str) -> Optional[str]:
 # -------------------------
 # Main parser
 # -------------------------
+@lru_cache(maxsize=1024)
+def _parse_structure(t: str, raw: str) -> tuple:
+    """Everything about a parse that does NOT depend on the clock.
+
+    Pure function of (normalized, raw) text, so repeated parses of the same
+    utterance hit the cache; parse_text resolves dates/times against `now`
+    afterwards."""
+    seen = {m.lastgroup for m in _TRIGGER_RE.finditer(t)}
+    has_digit = 'num' in seen or 'rel' in seen
+
+    # "X phút nữa <event>, nhắc trước Y" / "X phút nữa <event>"
+    double = None
+    simple = None
+    rel_min = None
+    rel_hr = None
+    t_no_relative = t
+    if 'rel' in seen:
+        m_double = _RE_DOUBLE_REL.search(t)
+        if m_double:
+            raw_ev = _RE_EV_TAIL.sub('', m_double.group(3).strip()).strip() or "Sự kiện"
+            double = (int(m_double.group(1)), int(m_double.group(4)), raw_ev)
+        else:
+            m_simple = _RE_SIMPLE_REL.search(t)
+            if m_simple:
+                raw_ev = _RE_EV_TAIL.sub('', m_simple.group(3).strip()).strip() or "Sự kiện"
+                simple = (int(m_simple.group(1)), raw_ev)
+
+        m_min = _RE_REL_MIN.search(t)
+        m_hr = _RE_REL_HR.search(t)
+        rel_min = int(m_min.group(1)) if m_min else None
+        rel_hr = int(m_hr.group(1)) if m_hr else None
+
+        # remove relative fragment for other extractions
+        t_no_relative = _RE_REL_FRAG.sub('', t)
+
+    reminder = extract_reminder(t_no_relative) if 'nhac' in seen else 15
+    repeat = extract_repeat(t) if 'rep' in seen else None
+    location = extract_location(raw)
+    nt = guess_natural_time(t) if 'tam' in seen else None
+    tm = extract_time(t) if has_digit else None
+    event_name = clean_event_name(t_no_relative)
+
+    importance = "normal"
+    if 'imp' in seen:
+        levels = {m.lastgroup for m in _RE_IMPORTANCE.finditer(t)}
+        if 'crit' in levels:
+            importance = "critical"
+        elif 'imp' in levels:
+            importance = "important"
+
+    return (double, simple, rel_min, rel_hr, reminder, repeat, location,
+            nt, tm, event_name, importance)
+
+
 def parse_text(text: str) -> Optional[Dict]:
     if not text or not text.strip():
         return None
 
     raw = text.strip()
+
+    # cheap rejection: no digit and no trigger keyword means no extractor
+    # (nor the strptime fallback) can find a start time
+    low = raw.lower()
+    if not any(c.isdigit() for c in low) and not any(k in low for k in _TRIGGERS):
+        return None
+
     # norm WITHOUT removing diacritics (to avoid breaking dateparser/time recognition)
     t = norm(raw)
     now = datetime.now(LOCAL_TZ)
 
-    # --- FIX mạnh: "nhắc tui 5 phút nữa họp, nhắc trước 3 phút" ---
-    # Hỗ trợ dạng:  X phút nữa <event> , nhắc trước Y (phút|p)
-    m_double = re.search(
-        r'(\d+)\s*(phút|phut|p)\s*(?:nữa|nua)\s+(.+?)\s*(?:,|\s+)?nhắc\s*(?:trước\s*)?(\d+)',
-        t,
-        flags=re.IGNORECASE
-    )
+    (double, simple, rel_min, rel_hr, reminder, repeat, location,
+     nt, tm, event_name, importance) = _parse_structure(t, raw)
 
-
-
-    if m_double:
-        delta_min = int(m_double.group(1))
-        reminder = int(m_double.group(4))
+    # --- FIX mạnh: "nhắc tui 5 phút nữa họp, nhắc trước 3 phút" ---
+    if double:
+        delta_min, dbl_reminder, raw_ev = double
         dt_start = now + timedelta(minutes=delta_min)
-
-        # event name cleanup
-        raw_ev = m_double.group(3).strip()
-        raw_ev = re.sub(r'\b(nhắc|truoc|trước|phut|p|giờ|gio)\b.*', '', raw_ev).strip()
-        if not raw_ev:
-            raw_ev = "Sự kiện"
-
         return {
             "event": raw_ev,
             "start_time": to_iso(dt_start),
             "end_time": None,
-            "location": extract_location(raw),
-            "reminder_minutes": reminder,
+            "location": location,
+            "reminder_minutes": dbl_reminder,
             "importance": "normal",
             "repeat": None,
             "repeat_count": 0,
@@ -476,20 +721,14 @@ def parse_text(text: str) -> Optional[Dict]:
         }
 
     # --- FIX: "nhac tui 5 phut nua hop" ---
-    m_simple = re.search(r'(\d+)\s*(phút|phut|p)\s*(?:nữa|nua)\s+(.+)', t)
-    if m_simple:
-        dt_start = now + timedelta(minutes=int(m_simple.group(1)))
-        raw_ev = m_simple.group(3).strip()
-        raw_ev = re.sub(r'\b(nhắc|truoc|trước|phut|p|giờ|gio)\b.*', '', raw_ev).strip()
-
-        if not raw_ev:
-            raw_ev = "Sự kiện"
-
+    if simple:
+        delta_min, raw_ev = simple
+        dt_start = now + timedelta(minutes=delta_min)
         return {
             "event": raw_ev,
             "start_time": to_iso(dt_start),
             "end_time": None,
-            "location": extract_location(raw),
+            "location": location,
             "reminder_minutes": 15,   # mặc định
             "importance": "normal",
             "repeat": None,
@@ -498,78 +737,53 @@ def parse_text(text: str) -> Optional[Dict]:
             "isStop": 0
         }
 
-
-
-
     # relative minutes/hours
-    m_min = re.search(r'(\d+)\s*(phút|phut|p)\s*(?:nữa|nua)', t)
-    m_hr  = re.search(r'(\d+)\s*(giờ|gio|g|h)\s*(?:nữa|nua)', t)
-
-
     dt_start = None
-
-    if m_min:
-        dt_start = now + timedelta(minutes=int(m_min.group(1)))
-    elif m_hr:
-        dt_start = now + timedelta(hours=int(m_hr.group(1)))
-
-    # remove relative fragment for other extractions
-    t_no_relative = re.sub(r'\d+\s*(phút|phut|p|ph|giờ|gio|g|h)\s*nữa', '', t)
-
-    reminder = extract_reminder(t_no_relative)
-    repeat = extract_repeat(t)
-    location = extract_location(raw)
+    if rel_min is not None:
+        dt_start = now + timedelta(minutes=rel_min)
+    elif rel_hr is not None:
+        dt_start = now + timedelta(hours=rel_hr)
 
     # if not relative, try absolute parsing: advanced date -> explicit time -> natural times -> dateparser
     if not dt_start:
-        adv_date = extract_advanced_relative_date(t)
-        d = adv_date or extract_date(t) or now.date()
+        today = now.date()
+        adv_date = extract_advanced_relative_date(t, today)
+        d = adv_date or extract_date(t, today) or today
 
-        # natural time guesses (tầm chiều...)
-        nt = guess_natural_time(t)
-
-        tm = extract_time(t)
         if tm:
             h, mn = tm
             try:
                 dt_start = datetime.combine(d, time(h, mn))
-            except:
-                dt_start = None
+            except ValueError:
+                # garbled input ("25h", "10h75"): clamp into range instead
+                # of throwing the whole parse away
+                dt_start = datetime.combine(d, time(h % 24, mn % 60))
         elif nt:
             dt_start = datetime.combine(d, nt)
         else:
-            # fallback to dateparser (use raw because it may contain accents)
-            try:
-                parsed = dateparser.parse(raw, languages=["vi"], default=now)
-                if parsed:
-                    dt_start = parsed
-            except:
-                dt_start = None
+            # last resort: explicit date formats. (The old
+            # dateparser.parse(raw, languages=[...]) call always raised
+            # TypeError — dateutil has no such kwarg — and was swallowed.)
+            dt_start = None
+            for fmt in _FALLBACK_FORMATS:
+                try:
+                    dt_start = datetime.strptime(raw, fmt)
+                    break
+                except ValueError:
+                    continue
 
     if not dt_start:
         return None
 
     # localize if naive
     if dt_start.tzinfo is None:
-        dt_start = LOCAL_TZ.localize(dt_start)
+        dt_start = dt_start.replace(tzinfo=LOCAL_TZ)
     dt_start = dt_start.replace(second=0, microsecond=0)
 
     # if time already passed and no explicit 'hôm nay/mai' then move to next day
     if dt_start < now - timedelta(seconds=5):
         dt_start = dt_start + timedelta(days=1)
 
-
-
-    # event name extraction: use no-relative normalized form but prefer intent-capture (no-diacritics allowed)
-    # pass original raw to intent capture via remove_diacritics inside function
-    event_name = clean_event_name(t_no_relative)
-
-    importance = "normal"
-    if re.search(r'(quan trọng|uu tiên|uu tien|uu tien)', t):
-        importance = "important"
-    if re.search(r'(cực quan trọng|khan cap|khan cấp|khan cap|cuc quan trong)', t):
-        importance = "critical"
-
     return {
         "event": event_name,
         "start_time": to_iso(dt_start),
@@ -3,15 +3,26 @@ import threading
 from datetime import datetime, timedelta
 import pytz
 from plyer import notification
-from db import list_events, mark_notified, update_event_field, DB_PATH
-from dateutil import parser
+from db import (get_pending_notifications, get_next_notify_iso, add_change_listener,
+                record_notification, update_event_fields, mark_done)
 from dateutil.relativedelta import relativedelta
-import sqlite3
 
-CHECK_INTERVAL = 5        # seconds poll
+CHECK_INTERVAL = 5        # seconds; floor between batches when events are firing
+MAX_SLEEP = 300           # seconds; safety cap on idle sleep (DB changes wake us anyway)
 REPEAT_DELAY = 60         # seconds between repeated notifications
 AUTO_MARK_DELAY = 5 * 60  # seconds to auto-mark if user does not dismiss (5 minutes)
 
+# set by db.py after every committed write, so the loop re-reads its deadline
+# immediately instead of discovering new/edited events on the next poll
+_wake = threading.Event()
+
+
+class _StopEvent(threading.Event):
+    """Stop flag that also interrupts the scheduler's deadline sleep."""
+    def set(self):
+        super().set()
+        _wake.set()
+
 LOCAL_TZ = pytz.timezone("Asia/Ho_Chi_Minh")
 global_streamlit_alerts = []
 
@@ -41,17 +52,41 @@ def get_streamlit_alerts():
 
 
 def _parse_iso(s):
+    # every writer in this app produces .isoformat() strings, so the stdlib
+    # parser is enough (and much cheaper than dateutil's)
     try:
-        return parser.isoparse(s)
-    except Exception:
+        return datetime.fromisoformat(s)
+    except (TypeError, ValueError):
+        return None
+
+
+# (event_id, iso_string) -> datetime; rows rarely change between polls, so
+# unchanged events skip re-parsing entirely. A changed row gets a new iso
+# string and therefore a new key; the size cap flushes the stale leftovers.
+_ISO_CACHE = {}
+_ISO_CACHE_MAX = 4096
+
+
+def _cached_iso(ev_id, s):
+    if not s:
         return None
+    key = (ev_id, s)
+    v = _ISO_CACHE.get(key)
+    if v is None:
+        v = _parse_iso(s)
+        if v is None:
+            return None
+        if len(_ISO_CACHE) >= _ISO_CACHE_MAX:
+            _ISO_CACHE.clear()
+        _ISO_CACHE[key] = v
+    return v
 
 
 def _floor_to_min(dt: datetime) -> datetime:
     return dt.replace(second=0, microsecond=0)
 
 
-def _schedule_next_occurrence(cur, ev, start_dt, reminder_min):
+def _schedule_next_occurrence(ev, start_dt, reminder_min):
     rep = ev.get("repeat")
     if not rep:
         return False
@@ -67,24 +102,25 @@ def _schedule_next_occurrence(cur, ev, start_dt, reminder_min):
 
     next_notify_dt = _floor_to_min(new_start - timedelta(minutes=int(reminder_min or 0)))
 
-    cur.execute("""
-        UPDATE events
-        SET start_time=?, repeat_count=0, notified=0, next_notify=?, pending_auto_mark=0
-        WHERE id=?
-    """, (new_start.isoformat(), next_notify_dt.isoformat(), ev["id"]))
-
+    update_event_fields(
+        ev["id"],
+        start_time=new_start.isoformat(), repeat_count=0, notified=0,
+        next_notify=next_notify_dt.isoformat(), pending_auto_mark=0,
+    )
     return True
 
 
 def reminder_loop(stop_event: threading.Event):
+    add_change_listener(_wake.set)
     while not stop_event.is_set():
 
         now_local = datetime.now(LOCAL_TZ)
-        events = list_events()
-        active_events = [e for e in events if e.get("next_notify") is not None]
-        print(f"[DEBUG] Kiểm tra {len(active_events)} sự kiện hoạt động lúc {now_local.strftime('%H:%M:%S')}")
+        # only rows whose next_notify is due — filtered in SQL via the partial index
+        events = get_pending_notifications(now_local.isoformat())
+        if events:
+            print(f"[DEBUG] {len(events)} sự kiện đến hạn lúc {now_local.strftime('%H:%M:%S')}")
 
-        next_wakeup_seconds = CHECK_INTERVAL
+        next_wakeup_seconds = CHECK_INTERVAL if events else MAX_SLEEP
 
         for ev in events:
             try:
@@ -92,7 +128,7 @@ def reminder_loop(stop_event: threading.Event):
                     continue
 
                 start_raw = ev.get("start_time")
-                start_dt = _parse_iso(start_raw)
+                start_dt = _cached_iso(ev["id"], start_raw)
                 if not start_dt:
                     continue
                 if start_dt.tzinfo is None:
@@ -105,7 +141,7 @@ def reminder_loop(stop_event: threading.Event):
 
                 next_notify_raw = ev.get("next_notify")
                 if next_notify_raw:
-                    next_notify = _parse_iso(next_notify_raw)
+                    next_notify = _cached_iso(ev["id"], next_notify_raw)
                     if next_notify and next_notify.tzinfo is None:
                         next_notify = LOCAL_TZ.localize(next_notify)
                 else:
@@ -126,13 +162,7 @@ def reminder_loop(stop_event: threading.Event):
                 # -----------------------------
                 if pending_auto == 1 and secs_until <= 0:
                     print(f"[INFO] Auto-marking event id={ev['id']}")
-
-                    update_event_field(ev["id"], "isStop", 1)
-                    mark_notified(ev["id"])
-
-                    update_event_field(ev["id"], "next_notify", None)
-                    update_event_field(ev["id"], "pending_auto_mark", 0)
-
+                    mark_done(ev["id"])
                     continue
 
                 # -----------------------------
@@ -146,45 +176,19 @@ def reminder_loop(stop_event: threading.Event):
                     )
                     add_streamlit_alert(ev)
 
-                    with sqlite3.connect(DB_PATH) as conn:
-                        cur = conn.cursor()
-
-                        cur.execute(
-                            "UPDATE events SET repeat_count = repeat_count + 1 WHERE id=?",
-                            (ev["id"],)
-                        )
-                        conn.commit()
-
-                        cur.execute("SELECT repeat_count FROM events WHERE id=?", (ev["id"],))
-                        updated_rc = cur.fetchone()[0]
-
-                        # still can notify more times
-                        if updated_rc < max_repeat:
-                            next_dt = _floor_to_min(now_local + timedelta(seconds=REPEAT_DELAY))
-                            cur.execute("UPDATE events SET next_notify=? WHERE id=?", (next_dt.isoformat(), ev["id"]))
-                            conn.commit()
+                    # bump repeat_count and (if repeats remain) schedule the
+                    # follow-up, in one transaction on the shared connection
+                    next_dt = _floor_to_min(now_local + timedelta(seconds=REPEAT_DELAY))
+                    updated_rc = record_notification(ev["id"], max_repeat, next_dt.isoformat())
 
+                    if updated_rc >= max_repeat:
+                        # last repeat reached
+                        if ev.get("repeat"):
+                            if not _schedule_next_occurrence(ev, start_dt, reminder_min):
+                                mark_done(ev["id"])
                         else:
-                            # last repeat reached
-                            if ev.get("repeat"):
-                                scheduled = _schedule_next_occurrence(cur, ev, start_dt, reminder_min)
-                                if scheduled:
-                                    conn.commit()
-                                else:
-                                    cur.execute("""
-                                        UPDATE events
-                                        SET notified=1, isStop=1, next_notify=NULL, pending_auto_mark=0
-                                        WHERE id=?
-                                    """, (ev["id"],))
-                                    conn.commit()
-                            else:
-                                # NON-REPEATING: AUTO-STOP immediately (not waiting 5 min)
-                                cur.execute("""
-                                    UPDATE events
-                                    SET notified=1, isStop=1, next_notify=NULL, pending_auto_mark=0
-                                    WHERE id=?
-                                """, (ev["id"],))
-                                conn.commit()
+                            # NON-REPEATING: AUTO-STOP immediately (not waiting 5 min)
+                            mark_done(ev["id"])
 
                 else:
                     if secs_until > 0:
@@ -195,11 +199,22 @@ def reminder_loop(stop_event: threading.Event):
                 print("[ERROR] reminder loop:", e)
                 continue
 
-        stop_event.wait(max(0.5, next_wakeup_seconds))
+        # sleep until the earliest scheduled deadline (clear first so a write
+        # landing after the query below still interrupts the wait)
+        _wake.clear()
+        nxt_iso = get_next_notify_iso()
+        if nxt_iso:
+            nxt = _parse_iso(nxt_iso)
+            if nxt is not None:
+                if nxt.tzinfo is None:
+                    nxt = LOCAL_TZ.localize(nxt)
+                secs = (nxt - datetime.now(LOCAL_TZ)).total_seconds()
+                next_wakeup_seconds = min(next_wakeup_seconds, max(0.5, secs))
+        _wake.wait(min(MAX_SLEEP, max(0.5, next_wakeup_seconds)))
 
 
 def start_reminder_thread():
-    stop_event = threading.Event()
+    stop_event = _StopEvent()
     t = threading.Thread(target=reminder_loop, args=(stop_event,), daemon=True)
     t.start()
     print("[INFO] Reminder thread started.")